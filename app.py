@@ -1,44 +1,214 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from datetime import datetime
+import numba
+import bisect
+import orjson
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import time
+import math
+import uuid
 
 st.set_page_config(page_title="MRV-P Navigator", layout="wide")
 
 # -----------------------------
 # STATE
 # -----------------------------
+# layout colunar (SoA) do histórico: uma coluna = um ndarray tipado,
+# crescido geometricamente — DataFrame vira uma view zero-copy dos buffers
+RUNS_SCHEMA = {
+    "obra_id": object,
+    "data": object,
+    "horas_corte": np.float32,
+    "energia_kwh": np.float32,
+    "num_viagens": np.float32,
+    "area_m2": np.float32,
+    "peso_estimado_t": np.float32,
+    "aco_por_hora": np.float32,
+    "aco_por_kwh": np.float32,
+    "aco_por_viagem": np.float32,
+    "aco_por_m2": np.float32,
+    "OEI": np.float32,
+    "aco_previsto_t": np.float32,
+    "p05_t": np.float32,
+    "p95_t": np.float32,
+    "mrv_completude": np.float32,
+    "mrv_consistencia": np.float32,
+    "mrv_evidencia": np.float32,
+    "mrv_score": np.float32,
+    "mrv_status": object,
+}
+
+# dtypes de leitura do CSV: float32 basta para as magnitudes deste app
+# e reduz à metade os bytes movidos no parse
+CSV_DTYPES = {
+    "horas_corte": "float32",
+    "energia_kwh": "float32",
+    "num_viagens": "float32",
+    "area_m2": "float32",
+    "peso_estimado_t": "float32",
+}
+
+# colunas obrigatórias do upload (as mesmas do template)
+UPLOAD_COLS = ["obra_id", "data", *CSV_DTYPES]
+
+# template de upload: constante pré-codificada — nada a reconstruir por rerun
+_TEMPLATE_CSV = (
+    b"obra_id,data,horas_corte,energia_kwh,num_viagens,area_m2,peso_estimado_t\n"
+    b"P2-ICTSI,2025-12-26,120,4500,15,1800,900\n"
+)
+
 if "audit_log" not in st.session_state:
     st.session_state.audit_log = []
-if "runs" not in st.session_state:
-    st.session_state.runs = []  # histórico de registros (cada linha = uma execução)
+if "run_cols" not in st.session_state:
+    st.session_state.run_cols = {name: np.empty(0, dtype=d) for name, d in RUNS_SCHEMA.items()}
+    st.session_state.n_runs = 0  # linhas válidas (capacidade pode ser maior)
+    # ordem de exibição mantida incrementalmente: tuplas (data, obra_id, linha)
+    # ascendentes — evita o sort_values sobre o histórico inteiro a cada rerun
+    st.session_state.sort_keys = []
+# id da sessão: entra na chave dos caches abaixo — st.cache_data é
+# compartilhado entre sessões, e só o contador colidiria entre usuários
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+# contadores de revisão: invalidam os caches abaixo sem hashear os dados inteiros
+if "runs_rev" not in st.session_state:
+    st.session_state.runs_rev = 0
+if "audit_rev" not in st.session_state:
+    st.session_state.audit_rev = 0
+
+def append_run(values: dict):
+    cols = st.session_state.run_cols
+    n = st.session_state.n_runs
+    cap = len(cols["obra_id"])
+    if n == cap:
+        new_cap = max(8, cap * 2)
+        for name in cols:
+            cols[name] = np.resize(cols[name], new_cap)
+    for name in cols:
+        cols[name][n] = values[name]
+    # chaves normalizadas para str: célula vazia no CSV vira NaN (float), e
+    # float não compara com str na ordenação
+    bisect.insort(st.session_state.sort_keys, (str(values["data"]), str(values["obra_id"]), n))
+    st.session_state.n_runs = n + 1
+    st.session_state.runs_rev += 1
+
+def extend_runs(frame: pd.DataFrame):
+    # anexa um lote inteiro columnwise (sem passar linha a linha)
+    cols = st.session_state.run_cols
+    n = st.session_state.n_runs
+    for name in cols:
+        vals = frame[name].to_numpy().astype(cols[name].dtype, copy=False)
+        cols[name] = np.concatenate([cols[name][:n], vals])
+    st.session_state.n_runs = n + len(frame)
+    # um re-sort por lote (não por rerun) é suficiente aqui; astype(str)
+    # normaliza NaN de células vazias, como no insort acima
+    st.session_state.sort_keys = sorted(
+        zip(cols["data"][:st.session_state.n_runs].astype(str),
+            cols["obra_id"][:st.session_state.n_runs].astype(str),
+            range(st.session_state.n_runs)))
+    st.session_state.runs_rev += 1
+
+def reset_runs():
+    st.session_state.run_cols = {name: np.empty(0, dtype=d) for name, d in RUNS_SCHEMA.items()}
+    st.session_state.n_runs = 0
+    st.session_state.sort_keys = []
+    st.session_state.runs_rev += 1
+
+# dict vazio compartilhado: evita alocar um {} novo por evento sem detalhes
+_EMPTY_DETAILS = {}
 
 def log_event(event: str, details: dict | None = None):
+    # timestamp inteiro (ns): sem alocação/aritmética de calendário por evento;
+    # a formatação ISO fica para a exibição/exportação (vetorizada)
     st.session_state.audit_log.append({
-        "ts": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "ts_ns": time.time_ns(),
         "event": event,
-        "details": details or {}
+        "details": details if details is not None else _EMPTY_DETAILS
     })
+    st.session_state.audit_rev += 1
+
+@st.cache_data(show_spinner=False)
+def audit_df(sid: str, rev: int) -> pd.DataFrame:
+    df = pd.DataFrame(st.session_state.audit_log)
+    df.insert(0, "ts", pd.to_datetime(df["ts_ns"], unit="ns", utc=True).dt.strftime("%Y-%m-%dT%H:%M:%SZ"))
+    return df
+
+@st.cache_data(show_spinner=False)
+def runs_df(sid: str, rev: int) -> pd.DataFrame:
+    # rev = st.session_state.runs_rev; muda a cada append, então o hit é seguro
+    cols = st.session_state.run_cols
+    n = st.session_state.n_runs
+    return pd.DataFrame({k: v[:n] for k, v in cols.items()}, copy=False)
+
+@st.cache_data(show_spinner=False)
+def runs_table(sid: str, rev: int) -> pa.Table:
+    # tabela Arrow direto dos buffers de coluna (ordem de exibição do Tab 2):
+    # o st.dataframe aceita Arrow nativamente, sem passar pelo pandas
+    cols = st.session_state.run_cols
+    n = st.session_state.n_runs
+    ordem = [linha for _, _, linha in reversed(st.session_state.sort_keys)]
+    # colunas object podem misturar str e NaN (células vazias do CSV): declarar
+    # string + from_pandas converte NaN em null em vez de inferir double
+    return pa.table({
+        name: pa.array(buf[:n][ordem], type=pa.string(), from_pandas=True)
+        if buf.dtype == object else pa.array(buf[:n][ordem])
+        for name, buf in cols.items()})
+
+@st.cache_data(show_spinner=False)
+def runs_csv_bytes(sid: str, rev: int) -> bytes:
+    # escritor CSV do Arrow (C) em vez do to_csv do pandas
+    buf = pa.BufferOutputStream()
+    pacsv.write_csv(pa.Table.from_pandas(runs_df(sid, rev), preserve_index=False), buf)
+    return buf.getvalue().to_pybytes()
+
+@st.cache_data(show_spinner=False)
+def audit_csv_bytes(sid: str, rev: int) -> bytes:
+    return audit_df(sid, rev).to_csv(index=False).encode("utf-8")
+
+@st.cache_data(show_spinner=False)
+def audit_json_bytes(sid: str, rev: int) -> bytes:
+    return orjson.dumps(st.session_state.audit_log, option=orjson.OPT_APPEND_NEWLINE)
+
+def _missing(x) -> bool:
+    # predicado tipado no lugar do antigo `x in (0, 0.0, None, np.nan)`:
+    # um branch só, e correto para NaN calculado (NaN nunca é igual a NaN)
+    return x is None or (isinstance(x, (float, np.floating)) and (x == 0.0 or math.isnan(x)))
+
+def _input(row: dict, key: str) -> float:
+    v = row.get(key, 0)
+    return 0.0 if _missing(v) else round(float(v), 6)
+
+# st.cache_data (e não lru_cache): o rerun do Streamlit redefine o módulo
+# inteiro, o que recriaria um lru_cache vazio a cada interação
+@st.cache_data(show_spinner=False, max_entries=256)
+def _features_cached(horas, energia, viagens, area, peso):
+    horas = np.float32(horas)
+    energia = np.float32(energia)
+    viagens = np.float32(viagens)
+    area = np.float32(area)
+    peso = np.float32(peso)
+
+    # KPIs (eficiência) — o max(.., 1e-9) já garante divisor não nulo
+    en = max(energia, 1e-9)
+    aco_por_hora = peso / max(horas, 1e-9)
+    aco_por_kwh = peso / en
+    aco_por_viagem = peso / max(viagens, 1e-9)
+    aco_por_m2 = peso / max(area, 1e-9)
 
-def safe_div(a, b, default=np.nan):
-    return a / b if b not in (0, 0.0, None) else default
+    # OEI simples (placeholder do paper): (produtividade) / energia
+    oei = aco_por_hora / en
+    return horas, energia, viagens, area, peso, aco_por_hora, aco_por_kwh, aco_por_viagem, aco_por_m2, oei
 
 def compute_features(row: dict) -> dict:
-    # Entradas
-    horas = float(row.get("horas_corte", 0))
-    energia = float(row.get("energia_kwh", 0))
-    viagens = float(row.get("num_viagens", 0))
-    area = float(row.get("area_m2", 0))
-    peso = float(row.get("peso_estimado_t", 0))
-
-    # KPIs (eficiência)
-    aco_por_hora = safe_div(peso, max(horas, 1e-9), default=0.0)
-    aco_por_kwh = safe_div(peso, max(energia, 1e-9), default=0.0)
-    aco_por_viagem = safe_div(peso, max(viagens, 1e-9), default=0.0)
-    aco_por_m2 = safe_div(peso, max(area, 1e-9), default=0.0)
-
-    # OEI simples (placeholder do paper): (produtividade) / energia
-    oei = safe_div(aco_por_hora, max(energia, 1e-9), default=0.0)
+    # entradas arredondadas a 6 casas: chave de cache estável para floats
+    (horas, energia, viagens, area, peso,
+     aco_por_hora, aco_por_kwh, aco_por_viagem, aco_por_m2, oei) = _features_cached(
+        _input(row, "horas_corte"),
+        _input(row, "energia_kwh"),
+        _input(row, "num_viagens"),
+        _input(row, "area_m2"),
+        _input(row, "peso_estimado_t"))
 
     return {
         "horas_corte": horas,
@@ -53,6 +223,10 @@ def compute_features(row: dict) -> dict:
         "OEI": oei
     }
 
+@st.cache_data(show_spinner=False, max_entries=256)
+def _pred_cached(horas, energia, peso):
+    return float(pred_ufunc(np.float32(horas), np.float32(energia), np.float32(peso)))
+
 def predict_steel_t(features: dict) -> tuple[float, float, float]:
     """
     MVP sem modelo:
@@ -60,33 +234,132 @@ def predict_steel_t(features: dict) -> tuple[float, float, float]:
     - Ajusta levemente por eficiência (OEI) para não ficar bobo
     - Retorna (pred, p05, p95) como faixa simples
     """
-    base = features["peso_estimado_t"] * 0.95
-
-    # ajuste fraco por OEI (normalizado) só para dar sinal
-    oei = features["OEI"]
-    adj = 1.0 + np.clip(oei * 10_000, -0.05, 0.05)  # controle de magnitude
-    pred = base * adj
+    # mesmo código de máquina do lote, chamado com escalares
+    pred = _pred_cached(round(float(features["horas_corte"]), 6),
+                        round(float(features["energia_kwh"]), 6),
+                        round(float(features["peso_estimado_t"]), 6))
 
     # intervalo simples (p05/p95) como placeholder de incerteza
     p05 = pred * 0.90
     p95 = pred * 1.10
-    return float(pred), float(p05), float(p95)
+    return pred, p05, p95
+
+# assinaturas explícitas: o mesmo código de máquina atende o caminho manual
+# (escalares) e o lote (arrays), sem o custo de JIT no primeiro clique
+_SIGS_HEP = ["float32(float32, float32, float32)",
+             "float64(float64, float64, float64)"]
+_SIGS_ALL = ["float32(float32, float32, float32, float32, float32)",
+             "float64(float64, float64, float64, float64, float64)"]
+
+@st.cache_resource(show_spinner=False)
+def _compiled_ufuncs():
+    # fábrica cacheada por processo: o Streamlit reexecuta o script inteiro a
+    # cada interação, e decoradores vectorize no escopo do módulo recompilariam
+    # os três ufuncs (~1s) em todo rerun; aqui compilam uma vez só
+    # (sem fastmath: ele autoriza o LLVM a assumir "sem NaN", o que quebraria
+    # os np.isnan abaixo e a propagação de NaN na predição)
+    # (target="cpu", não "parallel": compilar um ufunc paralelo fora da thread
+    # principal — caso do ScriptRunner do Streamlit — trava o workqueue do
+    # numba no encerramento do processo; kernels deste tamanho são memory-bound
+    # e não pagariam o dispatch de thread-pool de qualquer forma)
+
+    @numba.vectorize(_SIGS_HEP, target="cpu")
+    def pred_ufunc(horas, energia, peso):
+        aph = peso / max(horas, 1e-9)
+        oei = aph / max(energia, 1e-9)
+        if np.isnan(oei):
+            return np.nan  # entrada NaN propaga, como o np.clip original
+        adj = 1.0 + min(0.05, max(-0.05, oei * 10_000))
+        return peso * 0.95 * adj
+
+    @numba.vectorize(_SIGS_ALL, target="cpu")
+    def completude_ufunc(horas, energia, viagens, area, peso):
+        filled = 0
+        if horas != 0 and not np.isnan(horas):
+            filled += 1
+        if energia != 0 and not np.isnan(energia):
+            filled += 1
+        if viagens != 0 and not np.isnan(viagens):
+            filled += 1
+        if area != 0 and not np.isnan(area):
+            filled += 1
+        if peso != 0 and not np.isnan(peso):
+            filled += 1
+        return filled / 5.0
+
+    @numba.vectorize(_SIGS_HEP, target="cpu")
+    def consistencia_ufunc(horas, energia, peso):
+        # heurísticas como aritmética de booleanos: sem branches por linha,
+        # o LLVM emite código reto vetorizável (min/max viram vminss/vmaxss)
+        aph = peso / max(horas, 1e-9)
+        cons = (1.0
+                - 0.3 * ((horas <= 0) | (energia <= 0))
+                - 0.4 * (peso <= 0)
+                - 0.2 * (aph > 200))
+        return min(1.0, max(0.0, cons))
+
+    return pred_ufunc, completude_ufunc, consistencia_ufunc
+
+pred_ufunc, completude_ufunc, consistencia_ufunc = _compiled_ufuncs()
+
+def process_batch(df: pd.DataFrame, w_comp=0.4, w_cons=0.3, w_evid=0.3, evidence_level=0.8) -> pd.DataFrame:
+    """
+    Pipeline em lote (KPIs → predição → MRV) via ufuncs compilados.
+    Mesmas contas de compute_features/predict_steel_t/mrv_score, mas
+    columnwise — evita reconstruir dicts linha a linha via iterrows().
+    """
+    horas = df["horas_corte"].to_numpy(np.float32)
+    energia = df["energia_kwh"].to_numpy(np.float32)
+    viagens = df["num_viagens"].to_numpy(np.float32)
+    area = df["area_m2"].to_numpy(np.float32)
+    peso = df["peso_estimado_t"].to_numpy(np.float32)
+    n = len(df)
+
+    # KPIs (eficiência)
+    en = np.maximum(energia, 1e-9)
+    aco_por_hora = peso / np.maximum(horas, 1e-9)
+    aco_por_kwh = peso / en
+    aco_por_viagem = peso / np.maximum(viagens, 1e-9)
+    aco_por_m2 = peso / np.maximum(area, 1e-9)
+    oei = aco_por_hora / en
+
+    pred = pred_ufunc(horas, energia, peso)
+    p05 = pred * 0.90
+    p95 = pred * 1.10
+
+    completude = completude_ufunc(horas, energia, viagens, area, peso)
+    cons = consistencia_ufunc(horas, energia, peso)
+    evidencia = float(np.clip(evidence_level, 0.0, 1.0))
+    score = w_comp * completude + w_cons * cons + w_evid * evidencia
+    status = np.where(score >= 0.80, "CONFORME", np.where(score >= 0.60, "ATENÇÃO", "NÃO CONFORME"))
+
+    return pd.concat([df, pd.DataFrame({
+        "aco_por_hora": aco_por_hora,
+        "aco_por_kwh": aco_por_kwh,
+        "aco_por_viagem": aco_por_viagem,
+        "aco_por_m2": aco_por_m2,
+        "OEI": oei,
+        "aco_previsto_t": pred,
+        "p05_t": p05,
+        "p95_t": p95,
+        "mrv_completude": completude,
+        "mrv_consistencia": cons,
+        "mrv_evidencia": np.full(n, evidencia),
+        "mrv_score": score,
+        "mrv_status": status
+    }, index=df.index)], axis=1)
 
 def mrv_score(features: dict, w_comp=0.4, w_cons=0.3, w_evid=0.3, evidence_level=0.8) -> dict:
-    # Completude: entradas mínimas
-    required = ["horas_corte", "energia_kwh", "num_viagens", "area_m2", "peso_estimado_t"]
-    filled = sum(1 for k in required if features.get(k, 0) not in (0, 0.0, None, np.nan))
-    completude = filled / len(required)
-
-    # Consistência: heurísticas simples
-    cons = 1.0
-    if features["horas_corte"] <= 0 or features["energia_kwh"] <= 0:
-        cons -= 0.3
-    if features["peso_estimado_t"] <= 0:
-        cons -= 0.4
-    if features["aco_por_hora"] > 200:  # regra conservadora
-        cons -= 0.2
-    consistencia = float(np.clip(cons, 0.0, 1.0))
+    horas = features["horas_corte"]
+    energia = features["energia_kwh"]
+    peso = features["peso_estimado_t"]
+
+    # Completude: entradas mínimas (NaN conta como ausente)
+    completude = float(completude_ufunc(horas, energia, features["num_viagens"],
+                                        features["area_m2"], peso))
+
+    # Consistência: heurísticas simples (mesmo ufunc do lote)
+    consistencia = float(consistencia_ufunc(horas, energia, peso))
 
     evidencia = float(np.clip(evidence_level, 0.0, 1.0))
 
@@ -115,38 +388,35 @@ with tabs[0]:
     st.subheader("1) Entrada de dados")
     mode = st.radio("Modo", ["Manual", "Upload CSV"], horizontal=True)
 
-    template = pd.DataFrame([{
-        "obra_id": "P2-ICTSI",
-        "data": "2025-12-26",
-        "horas_corte": 120,
-        "energia_kwh": 4500,
-        "num_viagens": 15,
-        "area_m2": 1800,
-        "peso_estimado_t": 900
-    }])
-
     if mode == "Upload CSV":
         st.write("Formato esperado (colunas): `obra_id,data,horas_corte,energia_kwh,num_viagens,area_m2,peso_estimado_t`")
         st.download_button(
             "Baixar template CSV",
-            data=template.to_csv(index=False).encode("utf-8"),
+            data=_TEMPLATE_CSV,
             file_name="template_mrvp.csv",
             mime="text/csv"
         )
         up = st.file_uploader("Envie o CSV", type=["csv"])
         if up:
-            df = pd.read_csv(up)
-            st.dataframe(df, use_container_width=True)
-            if st.button("Processar todas as linhas"):
-                for _, r in df.iterrows():
-                    row = r.to_dict()
-                    feats = compute_features(row)
-                    pred, p05, p95 = predict_steel_t(feats)
-                    mrv = mrv_score(feats)
-                    out = {**row, **feats, "aco_previsto_t": pred, "p05_t": p05, "p95_t": p95, **{f"mrv_{k}": v for k, v in mrv.items()}}
-                    st.session_state.runs.append(out)
-                log_event("batch_processed", {"rows": int(len(df))})
-                st.success(f"Processado: {len(df)} linha(s). Vá para a aba Resultados.")
+            # prévia limitada: não materializa o arquivo inteiro no navegador
+            preview = pd.read_csv(up, nrows=100, dtype=CSV_DTYPES)
+            faltantes = [c for c in UPLOAD_COLS if c not in preview.columns]
+            if faltantes:
+                # valida o cabeçalho antes de processar: sem isso o lote
+                # morreria com KeyError no meio do pipeline
+                st.error(f"CSV inválido: faltam as colunas {', '.join(faltantes)}. Use o template acima.")
+            else:
+                st.caption("Prévia (primeiras 100 linhas)")
+                st.dataframe(preview, use_container_width=True)
+                if st.button("Processar todas as linhas"):
+                    up.seek(0)
+                    total = 0
+                    # parse em chunks: memória limitada mesmo para CSVs grandes
+                    for chunk in pd.read_csv(up, chunksize=50_000, dtype=CSV_DTYPES):
+                        extend_runs(process_batch(chunk))
+                        total += len(chunk)
+                    log_event("batch_processed", {"rows": int(total)})
+                    st.success(f"Processado: {total} linha(s). Vá para a aba Resultados.")
     else:
         c1, c2, c3 = st.columns(3)
         obra_id = c1.text_input("Obra / Asset ID", value="P2-ICTSI")
@@ -186,81 +456,100 @@ with tabs[0]:
             mrv = mrv_score(feats, w_comp=w_comp, w_cons=w_cons, w_evid=w_evid, evidence_level=evidence_level)
 
             out = {**row, **feats, "aco_previsto_t": pred, "p05_t": p05, "p95_t": p95, **{f"mrv_{k}": v for k, v in mrv.items()}}
-            st.session_state.runs.append(out)
+            append_run(out)
             log_event("single_run", {"obra_id": obra_id, "data": data})
             st.success("Execução salva. Vá para a aba Resultados.")
 
 # -----------------------------
 # TAB 2: RESULTADOS
 # -----------------------------
-with tabs[1]:
+# fragmento: interações em outros pontos da página não reexecutam este bloco
+@st.fragment
+def render_resultados():
     st.subheader("2) Resultados")
-    if not st.session_state.runs:
+    n = st.session_state.n_runs
+    if n == 0:
         st.info("Nenhuma execução ainda. Vá em Entrada e rode o MRV-P.")
     else:
-        df_runs = pd.DataFrame(st.session_state.runs)
-
-        last = df_runs.iloc[-1].to_dict()
+        # métricas direto dos arrays de coluna — sem DataFrame intermediário
+        cols = st.session_state.run_cols
         c1, c2, c3, c4 = st.columns(4)
-        c1.metric("Aço previsto (t)", f"{last['aco_previsto_t']:.2f}")
-        c2.metric("P05–P95 (t)", f"{last['p05_t']:.2f} – {last['p95_t']:.2f}")
-        c3.metric("MRV Score", f"{last['mrv_score']:.2f}")
-        c4.metric("Status", f"{last['mrv_status']}")
+        c1.metric("Aço previsto (t)", f"{cols['aco_previsto_t'][n-1]:.2f}")
+        c2.metric("P05–P95 (t)", f"{cols['p05_t'][n-1]:.2f} – {cols['p95_t'][n-1]:.2f}")
+        c3.metric("MRV Score", f"{cols['mrv_score'][n-1]:.2f}")
+        c4.metric("Status", f"{cols['mrv_status'][n-1]}")
 
         st.markdown("**KPIs operacionais (última execução)**")
         k1, k2, k3, k4 = st.columns(4)
-        k1.metric("Aço / hora (t/h)", f"{last['aco_por_hora']:.2f}")
-        k2.metric("Aço / kWh (t/kWh)", f"{last['aco_por_kwh']:.6f}")
-        k3.metric("Aço / viagem (t)", f"{last['aco_por_viagem']:.2f}")
-        k4.metric("Aço / m² (t/m²)", f"{last['aco_por_m2']:.6f}")
+        k1.metric("Aço / hora (t/h)", f"{cols['aco_por_hora'][n-1]:.2f}")
+        k2.metric("Aço / kWh (t/kWh)", f"{cols['aco_por_kwh'][n-1]:.6f}")
+        k3.metric("Aço / viagem (t)", f"{cols['aco_por_viagem'][n-1]:.2f}")
+        k4.metric("Aço / m² (t/m²)", f"{cols['aco_por_m2'][n-1]:.6f}")
 
         st.markdown("**Histórico (todas as execuções)**")
-        st.dataframe(df_runs.sort_values(by=["data", "obra_id"], ascending=False), use_container_width=True)
+        st.dataframe(runs_table(st.session_state.session_id, st.session_state.runs_rev), use_container_width=True)
+
+with tabs[1]:
+    render_resultados()
 
 # -----------------------------
 # TAB 3: AUDITORIA
 # -----------------------------
-with tabs[2]:
+@st.fragment
+def render_auditoria():
     st.subheader("3) Auditoria (Audit Trail)")
     if not st.session_state.audit_log:
         st.info("Sem eventos ainda.")
     else:
-        st.dataframe(pd.DataFrame(st.session_state.audit_log), use_container_width=True)
+        st.dataframe(audit_df(st.session_state.session_id, st.session_state.audit_rev), use_container_width=True)
 
     colA, colB = st.columns(2)
     with colA:
         if st.button("Limpar log (somente sessão)"):
             st.session_state.audit_log = []
             log_event("audit_cleared", {})
-            st.success("Log limpo (da sessão atual).")
+            # o clique reexecuta só este fragmento; os outros tabs também
+            # exibem esse estado, então força um rerun do app inteiro
+            st.rerun(scope="app")
     with colB:
         st.caption("Sessão = enquanto essa aba estiver aberta. Persistência/assinatura entra na versão 2.")
 
+with tabs[2]:
+    render_auditoria()
+
 # -----------------------------
 # TAB 4: EXPORT
 # -----------------------------
-with tabs[3]:
+@st.fragment
+def render_export():
     st.subheader("4) Export")
-    if not st.session_state.runs:
+    if st.session_state.n_runs == 0:
         st.info("Nada para exportar ainda.")
     else:
-        df_runs = pd.DataFrame(st.session_state.runs)
-        df_audit = pd.DataFrame(st.session_state.audit_log)
-
         st.download_button(
             "Baixar resultados (CSV)",
-            data=df_runs.to_csv(index=False).encode("utf-8"),
+            data=runs_csv_bytes(st.session_state.session_id, st.session_state.runs_rev),
             file_name="mrvp_resultados.csv",
             mime="text/csv"
         )
         st.download_button(
             "Baixar audit trail (CSV)",
-            data=df_audit.to_csv(index=False).encode("utf-8"),
+            data=audit_csv_bytes(st.session_state.session_id, st.session_state.audit_rev),
             file_name="mrvp_audit_log.csv",
             mime="text/csv"
         )
+        st.download_button(
+            "Baixar audit trail (JSON)",
+            data=audit_json_bytes(st.session_state.session_id, st.session_state.audit_rev),
+            file_name="mrvp_audit_log.json",
+            mime="application/json"
+        )
 
         if st.button("Resetar execuções (somente sessão)"):
-            st.session_state.runs = []
+            reset_runs()
             log_event("runs_cleared", {})
-            st.success("Execuções resetadas (da sessão atual).")
+            # idem: Tab 2 e a auditoria renderizam este estado
+            st.rerun(scope="app")
+
+with tabs[3]:
+    render_export()